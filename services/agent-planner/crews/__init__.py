@@ -0,0 +1,4 @@
+from .program_crew import ProgramPlanningCrew
+from .knowledge_curator import KnowledgeCurator
+
+__all__ = ["ProgramPlanningCrew", "KnowledgeCurator"]
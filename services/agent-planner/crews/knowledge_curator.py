@@ -0,0 +1,1462 @@
+"""
+Knowledge Curator - Extracts reusable knowledge from agent conversations
+
+This module processes the conversation log after all planning rounds complete
+and extracts knowledge candidates that can be stored for organizational learning.
+"""
+
+import os
+import io
+import secrets
+import json
+import hashlib
+import functools
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+from pathlib import Path
+
+import yaml
+
+try:
+    import orjson  # C-accelerated JSON decode for large extraction outputs
+except ImportError:
+    orjson = None
+
+from models.schemas import (
+    ConversationEntry,
+    KnowledgeLedger,
+    KnowledgeEmission,
+    KnowledgeStats,
+    SupportingEvidence,
+    EPMProgram,
+)
+
+_embed_disk_cache = None
+
+
+@functools.lru_cache(maxsize=1)
+def _load_curator_yaml(curator_path: Path) -> Optional[Dict[str, Any]]:
+    """Read and parse the curator agent config once per process."""
+    if not curator_path.exists():
+        return None
+    with open(curator_path, "r") as f:
+        return yaml.safe_load(f)
+
+
+def _get_embed_disk_cache():
+    """Open the persistent embedding cache, or None if diskcache is absent."""
+    global _embed_disk_cache
+    if _embed_disk_cache is None:
+        try:
+            import diskcache
+            _embed_disk_cache = diskcache.Cache(".curator_embed_cache")
+        except ImportError:
+            _embed_disk_cache = False
+    return _embed_disk_cache or None
+
+
+@functools.lru_cache(maxsize=4096)
+def _embed(text: str):
+    """Embed a single content string, memoized in-process and on disk.
+
+    Curator re-runs on overlapping conversations (e.g. after a planning
+    failure) hit identical content strings; caching makes those re-embeds
+    free. The disk layer survives process restarts.
+    """
+    cache = _get_embed_disk_cache()
+    key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    if cache is not None and key in cache:
+        return cache[key]
+
+    model = KnowledgeCurator._load_embedding_model()
+    vector = model.encode([text], convert_to_numpy=True, normalize_embeddings=True)[0]
+
+    if cache is not None:
+        cache[key] = vector
+
+    return vector
+
+
+class _SemanticCache:
+    """Near-duplicate lookup over past extraction runs.
+
+    Re-curating the same program (orchestrator restart, concurrent branches
+    with near-identical conversations) repeats the expensive extraction
+    call. This caches parsed candidates keyed by the summary embedding and
+    serves any query with cosine similarity at or above the threshold.
+    Entries are appended to an ndjson file so hits survive restarts.
+    """
+
+    SIM_THRESHOLD = 0.95
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(
+            path or Path.home() / ".cache" / "premisia" / "curator_cache.ndjson"
+        )
+        self._vectors = []
+        self._values = []
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, "r") as f:
+                for line in f:
+                    record = json.loads(line)
+                    self._vectors.append(record["embedding"])
+                    self._values.append(record["candidates"])
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[Curator] Semantic cache load failed: {e}")
+
+    def get(self, embedding) -> Optional[List[Dict[str, Any]]]:
+        """Return cached candidates for a near-identical summary, or None."""
+        self._ensure_loaded()
+        if not self._vectors:
+            return None
+
+        try:
+            import numpy as np
+
+            sims = np.asarray(self._vectors, dtype=np.float32) @ \
+                np.asarray(embedding, dtype=np.float32)
+            best = int(sims.argmax())
+            if float(sims[best]) >= self.SIM_THRESHOLD:
+                return self._values[best]
+        except Exception as e:
+            print(f"[Curator] Semantic cache lookup failed: {e}")
+
+        return None
+
+    def put(self, embedding, candidates: List[Dict[str, Any]]):
+        """Record an extraction result, in memory and on disk."""
+        self._ensure_loaded()
+        vector = [float(v) for v in embedding]
+        self._vectors.append(vector)
+        self._values.append(candidates)
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps({"embedding": vector, "candidates": candidates}))
+                f.write("\n")
+        except OSError as e:
+            print(f"[Curator] Semantic cache write failed: {e}")
+
+
+_semantic_cache = _SemanticCache()
+
+
+class KnowledgeCurator:
+    """
+    Extracts reusable knowledge from multi-agent planning conversations.
+    
+    Processes conversation logs to identify:
+    - Facts: Verified statements about the business or industry
+    - Estimates: Quantified assumptions with uncertainty
+    - Constraints: Limitations that shaped decisions
+    - Lessons Learned: Insights from past experiences
+    - Decision Rationale: Why specific choices were made
+    - Patterns: Recurring themes or approaches
+    """
+
+    KNOWLEDGE_TYPES = [
+        "fact",
+        "estimate",
+        "constraint",
+        "lesson_learned",
+        "decision_rationale",
+        "pattern",
+    ]
+
+    KNOWLEDGE_SCOPES = [
+        "organization",
+        "industry",
+        "program_specific",
+    ]
+
+    KNOWLEDGE_TYPE_DESCRIPTIONS = {
+        "fact": "Verified statements about the business, market, or technology",
+        "estimate": "Quantified assumptions (timelines, costs, probabilities)",
+        "constraint": "Limitations that influenced decisions",
+        "lesson_learned": "Insights from experience that could help future planning",
+        "decision_rationale": "Why specific choices were made over alternatives",
+        "pattern": "Recurring themes or successful approaches",
+    }
+
+    # Rough character budget for conversation text per extraction request
+    EXTRACTION_CHAR_BUDGET = 15000
+
+    # Message Batches polling cadence and give-up threshold
+    BATCH_POLL_INTERVAL_SECONDS = 10
+    BATCH_TIMEOUT_SECONDS = 1800
+
+    # Cosine similarity above which two embedded contents are duplicates
+    EMBEDDING_DUP_THRESHOLD = 0.85
+
+    # MMR reranking: cap the deduplicated set at this many candidates,
+    # trading off confidence against similarity to already-selected picks
+    MMR_TOP_K = 30
+    MMR_LAMBDA = 0.7
+
+    # Conversation compaction: keep this many newest rounds verbatim and
+    # summarize the rest with a cheap model until the budget is met
+    COMPACT_RECENT_ROUNDS = 2
+    COMPACT_TOKEN_BUDGET = 12000
+    SUMMARY_MODEL = "claude-3-5-haiku-20241022"
+
+    # Model routing: extraction is structured classification where Haiku is
+    # sufficient and ~5x cheaper than Sonnet; the stronger model only
+    # reassesses candidates that land in the contested confidence band,
+    # and only when enough of them pile up to be worth a call
+    EXTRACTION_MODEL = "claude-3-5-haiku-20241022"
+    REPROCESS_CONFIDENCE_BAND = (0.4, 0.7)
+    REPROCESS_MIN_COUNT = 5
+
+    # Shared across instances - the model is expensive to load
+    _embedding_model = None
+
+    # Shared across instances - the SDK client keeps an HTTP connection
+    # pool, and curators are constructed per request
+    _shared_anthropic = None
+
+    # Static instruction block, identical on every extraction call. Kept
+    # separate from the per-program prompt so it can be server-side cached.
+    EXTRACTION_SYSTEM_PROMPT = """You are a knowledge management specialist extracting reusable knowledge from multi-agent planning conversations.
+
+For each knowledge candidate, provide:
+- task_id: Number of the task that produced this candidate
+- content: The knowledge statement (1-3 sentences)
+- summary: Brief title (5-10 words)
+- type: One of [fact, estimate, constraint, lesson_learned, decision_rationale, pattern]
+- scope: One of [organization, industry, program_specific]
+- confidence: 0.0-1.0 based on evidence strength
+- tags: Relevant keywords
+- supporting_agents: Which agents endorsed this knowledge
+- contradicting_agents: Which agents disagreed (if any)
+
+Output as a single JSON array covering all tasks:
+```json
+[
+  {
+    "task_id": 6,
+    "content": "...",
+    "summary": "...",
+    "type": "pattern",
+    "scope": "industry",
+    "confidence": 0.85,
+    "tags": ["tag1", "tag2"],
+    "supporting_agents": ["Program Coordinator", "Tech Architecture Lead"],
+    "contradicting_agents": []
+  }
+]
+```
+
+Extract 10-30 diverse knowledge candidates across all tasks. Focus on actionable, reusable insights."""
+
+    def __init__(self):
+        self.config_path = Path(__file__).parent.parent / "config"
+        self._round_summaries = {}
+        self._ingested_entries = {}
+        self._ingest_tasks = {}
+        self._initialize_llm()
+        self._load_curator_config()
+
+    def _initialize_llm(self):
+        """Initialize the Anthropic client for knowledge extraction.
+
+        Extraction is a single-agent, single-task workload, so the API is
+        called directly — no CrewAI planner, tool router, or verbose logger
+        in between — which is also what makes prompt caching, streaming,
+        and Message Batches available to it.
+        """
+        api_key = os.environ.get("ANTHROPIC_API_KEY")
+        if not api_key:
+            raise ValueError("ANTHROPIC_API_KEY environment variable not set")
+
+        if KnowledgeCurator._shared_anthropic is None:
+            import anthropic
+
+            KnowledgeCurator._shared_anthropic = anthropic.Anthropic(api_key=api_key)
+        self._anthropic = KnowledgeCurator._shared_anthropic
+
+    @classmethod
+    def _curator_model_id(cls) -> str:
+        """Model id for extraction calls, overridable via CURATOR_MODEL."""
+        return os.environ.get("CURATOR_MODEL", f"anthropic/{cls.EXTRACTION_MODEL}")
+
+    @staticmethod
+    def _reprocess_model_id() -> str:
+        """Model id for the low-confidence reassessment pass."""
+        return os.environ.get("CREWAI_MODEL", "anthropic/claude-sonnet-4-20250514")
+
+    def _load_curator_config(self):
+        """Load curator configuration from YAML (cached per process)."""
+        curator_path = self.config_path / "agents" / "knowledge_curator.yaml"
+        config = _load_curator_yaml(curator_path)
+        if config is not None:
+            self.config = config
+        else:
+            self.config = {
+                "role": "Knowledge Curator",
+                "goal": "Extract reusable knowledge from agent conversations",
+                "backstory": "You are a knowledge management specialist.",
+            }
+
+    def _prepare_conversation_summary(self, conversation_log: List[ConversationEntry]) -> str:
+        """Prepare a summary of the conversation for analysis."""
+        by_round = defaultdict(list)
+        for entry in conversation_log:
+            by_round[entry.round].append(entry)
+
+        # Write straight into a StringIO instead of joining a parts list,
+        # so large logs are materialized once rather than twice.
+        buf = io.StringIO()
+        for round_num, entries in sorted(by_round.items()):
+            if buf.tell():
+                buf.write("\n")
+            buf.write(f"\n=== Round {round_num} ===\n")
+
+            for entry in entries:
+                buf.write(f"\n[{entry.agent_name}]: {entry.message}\n")
+
+        return buf.getvalue()
+
+    def _estimate_tokens(self, text: str) -> int:
+        """Estimate the token count of a text block."""
+        try:
+            import tiktoken
+            return len(tiktoken.get_encoding("cl100k_base").encode(text))
+        except ImportError:
+            # ~4 chars per token is close enough for budgeting English prose
+            return len(text) // 4
+
+    def _summarize_round(self, round_num: int, entries: List[ConversationEntry]) -> str:
+        """Summarize one planning round with a cheap model; cached per round."""
+        if round_num in self._round_summaries:
+            return self._round_summaries[round_num]
+
+        round_text = "\n".join(f"[{e.agent_name}]: {e.message}" for e in entries)
+
+        summary = None
+        try:
+            response = self._anthropic.messages.create(
+                model=self.SUMMARY_MODEL,
+                max_tokens=300,
+                messages=[{
+                    "role": "user",
+                    "content": (
+                        "Summarize this planning round, keeping concrete facts, "
+                        "estimates, constraints, and decisions:\n\n"
+                        f"{round_text[:20000]}"
+                    )
+                }],
+            )
+            summary = "".join(
+                block.text for block in response.content
+                if getattr(block, "type", "") == "text"
+            ).strip()
+        except Exception as e:
+            print(f"[Curator] Round {round_num} summarization failed: {e}")
+
+        if not summary:
+            summary = round_text[:1200]
+
+        self._round_summaries[round_num] = summary
+        return summary
+
+    def _compact_conversation(
+        self,
+        conversation_log: List[ConversationEntry],
+        recent_rounds: int = COMPACT_RECENT_ROUNDS,
+        token_budget: int = COMPACT_TOKEN_BUDGET
+    ) -> str:
+        """Fit the conversation into the token budget without dropping rounds.
+
+        Hard-slicing the summary silently discarded later rounds. Instead,
+        keep the most recent rounds verbatim and compress the older ones into
+        per-round Haiku summaries, so the whole conversation's signal survives
+        at a fraction of the input tokens. Round summaries are cached on the
+        instance, so repeated curator calls reuse them.
+        """
+        full_summary = self._prepare_conversation_summary(conversation_log)
+        if self._estimate_tokens(full_summary) <= token_budget:
+            return full_summary
+
+        by_round = defaultdict(list)
+        for entry in conversation_log:
+            by_round[entry.round].append(entry)
+
+        rounds = sorted(by_round.keys())
+        verbatim = set(rounds[-recent_rounds:])
+
+        parts = []
+        older = [r for r in rounds if r not in verbatim]
+        if older:
+            parts.append("Previously:")
+            for round_num in older:
+                parts.append(
+                    f"[Round {round_num}] {self._summarize_round(round_num, by_round[round_num])}"
+                )
+
+        for round_num in rounds:
+            if round_num not in verbatim:
+                continue
+            parts.append(f"\n=== Round {round_num} ===\n")
+            for entry in by_round[round_num]:
+                parts.append(f"[{entry.agent_name}]: {entry.message}\n")
+
+        compacted = "\n".join(parts)
+
+        # Last resort if the verbatim tail alone still exceeds the budget
+        if self._estimate_tokens(compacted) > token_budget:
+            compacted = compacted[:token_budget * 4]
+
+        return compacted
+
+    def _build_extraction_batch(self, conversation_summary: str) -> Tuple[str, str]:
+        """Build the chunk and sub-task sections for a batched extraction prompt.
+
+        Instead of asking for all six knowledge categories in one monolithic
+        instruction (or issuing one call per category), each category becomes a
+        labeled sub-task over a conversation chunk. All sub-tasks ride in a
+        single LLM request, so the per-call overhead (system prompt, HTTP
+        round-trip) is paid once rather than per category.
+        """
+        # The summary is already compacted to budget; no hard slice needed
+        text = conversation_summary
+        chunk_size = self.EXTRACTION_CHAR_BUDGET // 2
+
+        chunks = []
+        while text:
+            if len(text) <= chunk_size:
+                chunks.append(text)
+                break
+            # Prefer to split on a round boundary so chunks stay coherent
+            split_at = text.rfind("\n=== Round", 0, chunk_size)
+            if split_at <= 0:
+                split_at = chunk_size
+            chunks.append(text[:split_at])
+            text = text[split_at:]
+
+        chunk_sections = [
+            f"### Conversation Chunk {i + 1}\n{chunk}"
+            for i, chunk in enumerate(chunks)
+        ]
+
+        task_sections = []
+        task_id = 0
+        for chunk_num in range(len(chunks)):
+            for knowledge_type, description in self.KNOWLEDGE_TYPE_DESCRIPTIONS.items():
+                task_id += 1
+                task_sections.append(
+                    f"### Task {task_id}\n"
+                    f"From Conversation Chunk {chunk_num + 1}, extract **{knowledge_type}** "
+                    f"candidates: {description}"
+                )
+
+        return "\n\n".join(chunk_sections), "\n\n".join(task_sections)
+
+    def _build_extraction_prompt(
+        self,
+        conversation_summary: str,
+        program: EPMProgram
+    ) -> str:
+        """Build the per-program (dynamic) portion of the extraction prompt."""
+        chunk_sections, task_sections = self._build_extraction_batch(conversation_summary)
+
+        return f"""
+Analyze this multi-agent planning conversation and extract reusable knowledge.
+
+**Program Context:**
+Title: {program.title}
+Description: {program.description}
+
+**Conversation Log:**
+{chunk_sections}
+
+**Answer every extraction task below. Tag each candidate with the task_id that produced it:**
+{task_sections}
+"""
+
+    @staticmethod
+    def _summary_embedding(conversation_summary: str):
+        """Embed a summary for cache lookup, or None without the stack."""
+        try:
+            return _embed(conversation_summary)
+        except Exception:
+            return None
+
+    def _extract_candidates_with_llm(
+        self,
+        conversation_summary: str,
+        program: EPMProgram
+    ) -> List[Dict[str, Any]]:
+        """Extract knowledge candidates, serving reruns from the semantic cache.
+
+        A summary whose embedding is near-identical (cosine >= 0.95) to a
+        past run returns that run's parsed candidates without an API call;
+        misses fall through to the LLM and are recorded afterwards.
+        """
+        embedding = self._summary_embedding(conversation_summary)
+        if embedding is not None:
+            cached = _semantic_cache.get(embedding)
+            if cached is not None:
+                print("[Curator] Semantic cache hit; skipping extraction call")
+                return cached
+
+        candidates = self._extract_candidates_uncached(conversation_summary, program)
+
+        if embedding is not None and candidates:
+            _semantic_cache.put(embedding, candidates)
+
+        return candidates
+
+    def _extract_candidates_uncached(
+        self,
+        conversation_summary: str,
+        program: EPMProgram
+    ) -> List[Dict[str, Any]]:
+        """Use LLM to extract knowledge candidates from conversation.
+
+        Calls the Anthropic API directly with the static instruction block
+        marked for prompt caching: every call within the cache window re-sends
+        only the conversation summary at full input price, while the cached
+        instructions are read back at a fraction of the cost. Falls back to
+        a plain non-streaming call if the streaming one fails.
+        """
+        extraction_prompt = self._build_extraction_prompt(conversation_summary, program)
+
+        try:
+            model_id = self._curator_model_id()
+
+            candidates = []
+            with self._anthropic.messages.stream(
+                model=model_id.split("/")[-1],
+                max_tokens=8192,
+                temperature=0.3,
+                system=[{
+                    "type": "text",
+                    "text": self.EXTRACTION_SYSTEM_PROMPT,
+                    "cache_control": {"type": "ephemeral"},
+                }],
+                messages=[{"role": "user", "content": extraction_prompt}],
+            ) as stream:
+                # Parse candidate objects as they close, overlapping the JSON
+                # decode with generation instead of waiting for the full reply.
+                candidates = list(self._iter_streamed_candidates(stream.text_stream))
+                response = stream.get_final_message()
+
+            cache_read = getattr(response.usage, "cache_read_input_tokens", 0)
+            if cache_read:
+                print(f"[Curator] Prompt cache hit: {cache_read} tokens read from cache")
+
+            if candidates:
+                return self._flatten_by_task(candidates)
+
+            # Stream produced no parseable objects (e.g. unexpected framing);
+            # fall back to parsing the assembled text in one pass.
+            text = "".join(
+                block.text for block in response.content
+                if getattr(block, "type", "") == "text"
+            )
+            return self._parse_candidates(text)
+        except Exception as e:
+            print(f"[Curator] Streaming extraction failed, retrying without stream: {e}")
+
+        try:
+            response = self._anthropic.messages.create(
+                model=self._curator_model_id().split("/")[-1],
+                max_tokens=8192,
+                temperature=0.3,
+                system=[{
+                    "type": "text",
+                    "text": self.EXTRACTION_SYSTEM_PROMPT,
+                    "cache_control": {"type": "ephemeral"},
+                }],
+                messages=[{"role": "user", "content": extraction_prompt}],
+            )
+            text = "".join(
+                block.text for block in response.content
+                if getattr(block, "type", "") == "text"
+            )
+            return self._parse_candidates(text)
+        except Exception as e:
+            print(f"Knowledge extraction failed: {e}")
+            return []
+
+    @staticmethod
+    def _iter_streamed_candidates(text_stream) -> Any:
+        """Yield candidate dicts from a text stream as their objects close.
+
+        Keeps a rolling buffer and a brace-depth counter: counting starts
+        after the first ``[``, and whenever depth returns to zero the
+        completed ``{...}`` substring is decoded and yielded. Partial
+        objects split across chunks are never passed to ``json.loads`` —
+        the scan position simply waits for the closing brace to arrive.
+        """
+        buffer = ""
+        scan = 0
+        depth = 0
+        obj_start = -1
+        in_array = False
+        in_string = False
+        escaped = False
+
+        for chunk in text_stream:
+            buffer += chunk
+            while scan < len(buffer):
+                char = buffer[scan]
+                if not in_array:
+                    if char == "[":
+                        in_array = True
+                elif in_string:
+                    if escaped:
+                        escaped = False
+                    elif char == "\\":
+                        escaped = True
+                    elif char == '"':
+                        in_string = False
+                elif char == '"':
+                    in_string = True
+                elif char == "{":
+                    if depth == 0:
+                        obj_start = scan
+                    depth += 1
+                elif char == "}":
+                    depth -= 1
+                    if depth == 0 and obj_start != -1:
+                        try:
+                            yield json.loads(buffer[obj_start:scan + 1])
+                        except json.JSONDecodeError as e:
+                            print(f"Skipping malformed candidate fragment: {e}")
+                        # Discard the consumed prefix so the buffer stays small
+                        buffer = buffer[scan + 1:]
+                        scan = -1
+                        obj_start = -1
+                elif char == "]" and depth == 0:
+                    return
+                scan += 1
+
+    def _parse_candidates(self, result: str) -> List[Dict[str, Any]]:
+        """Parse JSON candidates from LLM output."""
+        candidates = []
+
+        try:
+            json_start = result.find("```json")
+            json_end = result.find("```", json_start + 7)
+
+            if json_start != -1 and json_end != -1:
+                json_str = result[json_start + 7:json_end].strip()
+            else:
+                json_str = self._find_json_array(result)
+
+            if json_str:
+                candidates = self._loads(json_str)
+        except (json.JSONDecodeError, ValueError) as e:
+            print(f"Failed to parse candidates: {e}")
+
+        return self._flatten_by_task(candidates)
+
+    @staticmethod
+    def _find_json_array(result: str) -> Optional[str]:
+        """Slice the first balanced top-level JSON array out of mixed text.
+
+        A single forward scan with bracket-depth and string-escape tracking
+        replaces the old ``\\[[\\s\\S]*\\]`` regex, which could backtrack
+        badly on large malformed outputs.
+        """
+        start = result.find("[")
+        if start == -1:
+            return None
+
+        depth = 0
+        in_string = False
+        escaped = False
+        for i in range(start, len(result)):
+            char = result[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == "\\":
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char in "[{":
+                depth += 1
+            elif char in "]}":
+                depth -= 1
+                if depth == 0:
+                    return result[start:i + 1]
+        return None
+
+    @staticmethod
+    def _loads(json_str: str) -> Any:
+        """Decode JSON with orjson when installed, stdlib json otherwise."""
+        if orjson is not None:
+            try:
+                return orjson.loads(json_str)
+            except orjson.JSONDecodeError:
+                pass
+        return json.loads(json_str)
+
+    @staticmethod
+    def _flatten_by_task(candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Flatten batched output into a single task-ordered candidate list.
+
+        Groups by task_id for stable ordering, then drops the field since
+        downstream processing is category-agnostic.
+        """
+        by_task = {}
+        for candidate in candidates:
+            if not isinstance(candidate, dict):
+                continue
+            task_id = candidate.pop("task_id", 0)
+            if not isinstance(task_id, int):
+                try:
+                    task_id = int(task_id)
+                except (TypeError, ValueError):
+                    task_id = 0
+            if task_id not in by_task:
+                by_task[task_id] = []
+            by_task[task_id].append(candidate)
+
+        return [c for task_id in sorted(by_task.keys()) for c in by_task[task_id]]
+
+    def _validate_candidate(self, candidate: Dict[str, Any]) -> bool:
+        """Validate that a candidate has required fields."""
+        required_fields = ["content", "summary", "type", "scope", "confidence"]
+
+        for field in required_fields:
+            if field not in candidate:
+                return False
+
+        if candidate.get("type") not in self.KNOWLEDGE_TYPES:
+            return False
+
+        if candidate.get("scope") not in self.KNOWLEDGE_SCOPES:
+            return False
+
+        confidence = candidate.get("confidence", 0)
+        if not isinstance(confidence, (int, float)) or confidence < 0 or confidence > 1:
+            return False
+
+        return True
+
+    @classmethod
+    def _load_embedding_model(cls):
+        """Load the shared MiniLM model once per process."""
+        if cls._embedding_model is None:
+            from sentence_transformers import SentenceTransformer
+            cls._embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+        return cls._embedding_model
+
+    def _embed_contents(self, contents: List[str]):
+        """Embed candidate contents through the memoized _embed wrapper.
+
+        Returns a normalized NumPy matrix (one row per content), or None when
+        the embedding stack is not installed.
+        """
+        if not contents:
+            return None
+
+        try:
+            import numpy as np
+            from sentence_transformers import SentenceTransformer  # noqa: F401
+        except ImportError:
+            return None
+
+        return np.vstack([_embed(text) for text in contents])
+
+    def _deduplicate_candidates(
+        self,
+        candidates: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Remove duplicate or highly similar candidates.
+
+        Preferred path embeds all contents in one batch and runs the pairwise
+        step through a FAISS range search (BLAS-backed, scales to thousands
+        of candidates), which also catches paraphrased duplicates the
+        word-overlap score misses. Falls back to a NumPy matmul, then a
+        MinHash LSH index, then the original pairwise Jaccard scan as the
+        relevant libraries thin out.
+        """
+        unique = []
+        seen_summaries = set()
+        duplicates = 0
+
+        embeddings = self._embed_contents(
+            [c.get("content", "") for c in candidates]
+        )
+
+        if embeddings is not None:
+            try:
+                import faiss
+                import numpy as np
+
+                # Rows from _embed are already L2-normalized, so inner
+                # product is cosine similarity
+                matrix = np.ascontiguousarray(embeddings, dtype="float32")
+                index = faiss.IndexFlatIP(matrix.shape[1])
+                index.add(matrix)
+                lims, _, neighbor_ids = index.range_search(
+                    matrix, self.EMBEDDING_DUP_THRESHOLD
+                )
+
+                kept = set()
+                for i, candidate in enumerate(candidates):
+                    summary_lower = candidate.get("summary", "").lower().strip()
+
+                    if summary_lower in seen_summaries:
+                        duplicates += 1
+                        continue
+
+                    neighbors = neighbor_ids[lims[i]:lims[i + 1]]
+                    if any(int(j) in kept for j in neighbors if j != i):
+                        duplicates += 1
+                        continue
+
+                    seen_summaries.add(summary_lower)
+                    kept.add(i)
+                    unique.append(candidate)
+
+                return unique, duplicates
+            except ImportError:
+                pass
+
+            sims = embeddings @ embeddings.T
+            kept_indices = []
+
+            for i, candidate in enumerate(candidates):
+                summary_lower = candidate.get("summary", "").lower().strip()
+
+                if summary_lower in seen_summaries:
+                    duplicates += 1
+                    continue
+
+                if kept_indices and float(sims[i, kept_indices].max()) > self.EMBEDDING_DUP_THRESHOLD:
+                    duplicates += 1
+                    continue
+
+                seen_summaries.add(summary_lower)
+                kept_indices.append(i)
+                unique.append(candidate)
+
+            return unique, duplicates
+
+        try:
+            from datasketch import MinHash, MinHashLSH
+
+            lsh = MinHashLSH(threshold=0.8, num_perm=64)
+
+            for i, candidate in enumerate(candidates):
+                summary_lower = candidate.get("summary", "").lower().strip()
+                content_key = candidate.get("content", "")[:100].lower()
+
+                if summary_lower in seen_summaries:
+                    duplicates += 1
+                    continue
+
+                minhash = MinHash(num_perm=64)
+                for word in content_key.split():
+                    minhash.update(word.encode("utf8"))
+
+                if lsh.query(minhash):
+                    duplicates += 1
+                    continue
+
+                lsh.insert(str(i), minhash)
+                seen_summaries.add(summary_lower)
+                unique.append(candidate)
+
+            return unique, duplicates
+        except ImportError:
+            pass
+
+        # Tokenize each content key once up front instead of re-splitting
+        # both sides on every pairwise comparison.
+        token_sets = [
+            frozenset(c.get("content", "")[:100].lower().split())
+            for c in candidates
+        ]
+        kept_sets = []
+
+        for candidate, tokens in zip(candidates, token_sets):
+            summary_lower = candidate.get("summary", "").lower().strip()
+
+            if summary_lower in seen_summaries:
+                duplicates += 1
+                continue
+
+            is_duplicate = False
+            size = len(tokens)
+            for kept in kept_sets:
+                # Sets differing in size by more than 2x cannot clear the
+                # 0.8 Jaccard threshold; skip the intersection entirely
+                if min(size, len(kept)) * 2 < max(size, len(kept)):
+                    continue
+                union = len(tokens | kept)
+                if union and len(tokens & kept) / union > 0.8:
+                    is_duplicate = True
+                    duplicates += 1
+                    break
+
+            if not is_duplicate:
+                seen_summaries.add(summary_lower)
+                kept_sets.append(tokens)
+                unique.append(candidate)
+
+        return unique, duplicates
+
+    def _mmr_rerank(
+        self,
+        candidates: List[Dict[str, Any]],
+        k: int = MMR_TOP_K,
+        lambda_: float = MMR_LAMBDA
+    ) -> List[Dict[str, Any]]:
+        """Select a diverse top-k subset with maximal marginal relevance.
+
+        Threshold dedup still lets one topical cluster dominate the ledger;
+        MMR greedily picks the candidate maximizing
+        ``lambda * confidence - (1 - lambda) * max_sim_to_selected`` so
+        verified knowledge spans topics. Embeddings come from the memoized
+        per-text cache populated during dedup, so no extra inference runs.
+        The chosen subset is re-sorted by confidence to preserve the
+        original ordering downstream.
+        """
+        if len(candidates) <= k:
+            return candidates
+
+        embeddings = self._embed_contents(
+            [c.get("content", "") for c in candidates]
+        )
+        if embeddings is None:
+            # No embedding backend; fall back to a plain confidence cutoff
+            return sorted(
+                candidates,
+                key=lambda c: c.get("confidence", 0),
+                reverse=True
+            )[:k]
+
+        sims = embeddings @ embeddings.T
+        remaining = set(range(len(candidates)))
+        selected = []
+
+        while remaining and len(selected) < k:
+            best_idx = None
+            best_score = float("-inf")
+            for i in remaining:
+                relevance = candidates[i].get("confidence", 0)
+                penalty = float(sims[i, selected].max()) if selected else 0.0
+                score = lambda_ * relevance - (1 - lambda_) * penalty
+                if score > best_score:
+                    best_score = score
+                    best_idx = i
+            selected.append(best_idx)
+            remaining.discard(best_idx)
+
+        return sorted(
+            (candidates[i] for i in selected),
+            key=lambda c: c.get("confidence", 0),
+            reverse=True
+        )
+
+    def _reprocess_low_confidence(
+        self,
+        candidates: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Reassess mid-band confidence scores with the stronger model.
+
+        Routing extraction to Haiku keeps curation cheap, but piles more
+        candidates into the contested band. When enough accumulate, one
+        Sonnet call re-scores just those — far cheaper than running Sonnet
+        over the whole conversation. Scores are updated in place; any
+        failure leaves the Haiku scores untouched.
+        """
+        low, high = self.REPROCESS_CONFIDENCE_BAND
+        flagged = [
+            i for i, c in enumerate(candidates)
+            if low <= c.get("confidence", 0) < high
+        ]
+        if len(flagged) < self.REPROCESS_MIN_COUNT:
+            return candidates
+
+        try:
+            payload = [
+                {
+                    "index": i,
+                    "content": candidates[i].get("content", ""),
+                    "summary": candidates[i].get("summary", ""),
+                    "confidence": candidates[i].get("confidence", 0),
+                }
+                for i in flagged
+            ]
+
+            response = self._anthropic.messages.create(
+                model=self._reprocess_model_id().split("/")[-1],
+                max_tokens=2048,
+                temperature=0.0,
+                messages=[{
+                    "role": "user",
+                    "content": (
+                        "Reassess the confidence (0.0-1.0) of these knowledge "
+                        "candidates based on how specific, verifiable, and "
+                        "reusable each statement is. Respond with a JSON array "
+                        "of {\"index\": <int>, \"confidence\": <float>} only.\n\n"
+                        f"{json.dumps(payload)}"
+                    )
+                }],
+            )
+
+            text = "".join(
+                block.text for block in response.content
+                if getattr(block, "type", "") == "text"
+            )
+            updates = self._loads(self._find_json_array(text) or "[]")
+
+            for update in updates:
+                if not isinstance(update, dict):
+                    continue
+                index = update.get("index")
+                confidence = update.get("confidence")
+                if (isinstance(index, int) and 0 <= index < len(candidates)
+                        and isinstance(confidence, (int, float))):
+                    candidates[index]["confidence"] = max(0.0, min(1.0, float(confidence)))
+        except Exception as e:
+            print(f"[Curator] Low-confidence reassessment failed: {e}")
+
+        return candidates
+
+    @staticmethod
+    def _classify_candidate(candidate: Dict[str, Any]) -> str:
+        """Map a candidate to its verification status by confidence level."""
+        confidence = candidate.get("confidence", 0)
+        has_contradictions = bool(candidate.get("contradicting_agents", []))
+
+        if has_contradictions:
+            return "contested" if confidence >= 0.6 else "hypothesis"
+        if confidence >= 0.7:
+            return "verified"
+        if confidence >= 0.4:
+            return "contested"
+        return "hypothesis"
+
+    def _classified_emissions(
+        self,
+        candidates: List[Dict[str, Any]],
+        program: EPMProgram,
+        source: Dict[str, str]
+    ):
+        """Yield (status, emission) pairs in a single fused pass.
+
+        Classification and emission construction used to be separate
+        traversals with three intermediate candidate lists between them;
+        fusing them touches each candidate once.
+        """
+        for candidate in candidates:
+            status = self._classify_candidate(candidate)
+            yield status, self._create_emission(candidate, program, status, source)
+
+    @staticmethod
+    def _build_source(program: EPMProgram) -> Dict[str, str]:
+        """Build the shared source block once per ledger instead of per emission."""
+        return {
+            "program_id": program.id,
+            "program_name": program.title,
+            "generated_at": datetime.now().isoformat(),
+            "curator_version": "1.0.0"
+        }
+
+    def _create_emission(
+        self,
+        candidate: Dict[str, Any],
+        program: EPMProgram,
+        status: str = "verified",
+        source: Optional[Dict[str, str]] = None
+    ) -> KnowledgeEmission:
+        """Create a KnowledgeEmission from a candidate.
+
+        Uses model_construct throughout: candidates already passed
+        _validate_candidate, so re-running pydantic validation on every
+        field of every emission is pure overhead.
+        """
+        supporting_evidence = []
+        for agent_name in candidate.get("supporting_agents", []):
+            evidence = SupportingEvidence.model_construct(
+                agent_id=agent_name.lower().replace(" ", "_"),
+                agent_name=agent_name,
+                round=1,
+                statement=f"Endorsed: {candidate.get('summary', '')}"
+            )
+            supporting_evidence.append(evidence)
+
+        contradictions = []
+        for agent_name in candidate.get("contradicting_agents", []):
+            contradiction = SupportingEvidence.model_construct(
+                agent_id=agent_name.lower().replace(" ", "_"),
+                agent_name=agent_name,
+                round=1,
+                statement=f"Disputed: {candidate.get('summary', '')}"
+            )
+            contradictions.append(contradiction)
+
+        knowledge_type = candidate.get("type", "pattern")
+        if knowledge_type == "fact":
+            memory_layer = "semantic"
+        elif knowledge_type in ("lesson_learned", "decision_rationale"):
+            memory_layer = "episodic"
+        else:
+            memory_layer = "symbolic"
+
+        return KnowledgeEmission.model_construct(
+            id=secrets.token_hex(16),
+            content=candidate.get("content", ""),
+            summary=candidate.get("summary", ""),
+            type=knowledge_type,
+            scope=candidate.get("scope", "program_specific"),
+            suggested_memory_layer=memory_layer,
+            tags=candidate.get("tags", []),
+            confidence=candidate.get("confidence", 0.5),
+            verification_status=status,
+            supporting_evidence=supporting_evidence,
+            contradictions=contradictions if contradictions else None,
+            source=source if source is not None else self._build_source(program)
+        )
+
+    def _generate_fallback_emissions(
+        self,
+        program: EPMProgram,
+        conversation_log: List[ConversationEntry]
+    ) -> List[KnowledgeEmission]:
+        """Generate fallback emissions if LLM extraction fails."""
+        emissions = []
+        source = self._build_source(program)
+
+        if program.timeline and program.timeline.total_months:
+            emissions.append(KnowledgeEmission.model_construct(
+                id=secrets.token_hex(16),
+                content=f"Programs of this scale typically require {program.timeline.total_months} months for implementation.",
+                summary="Program duration benchmark",
+                type="pattern",
+                scope="industry",
+                suggested_memory_layer="semantic",
+                tags=["timeline", "duration", "benchmark"],
+                confidence=0.8,
+                verification_status="verified",
+                supporting_evidence=[
+                    SupportingEvidence.model_construct(
+                        agent_id="program_coordinator",
+                        agent_name="Program Coordinator",
+                        round=4,
+                        statement="Timeline validated across workstreams"
+                    )
+                ],
+                source=source
+            ))
+
+        if program.resource_plan:
+            emissions.append(KnowledgeEmission.model_construct(
+                id=secrets.token_hex(16),
+                content=f"Resource allocation of {program.resource_plan.total_headcount} FTEs recommended for programs of this scope and complexity.",
+                summary="Resource sizing guidelines",
+                type="estimate",
+                scope="organization",
+                suggested_memory_layer="semantic",
+                tags=["resources", "headcount", "staffing"],
+                confidence=0.75,
+                verification_status="verified",
+                supporting_evidence=[
+                    SupportingEvidence.model_construct(
+                        agent_id="finance_resources",
+                        agent_name="Finance & Resource Manager",
+                        round=4,
+                        statement="Resource plan validated against budget"
+                    )
+                ],
+                source=source
+            ))
+
+        if program.risk_register and program.risk_register.risks:
+            high_risks = [r for r in program.risk_register.risks if r.impact == "high"]
+            if high_risks:
+                emissions.append(KnowledgeEmission.model_construct(
+                    id=secrets.token_hex(16),
+                    content=f"High-impact risks identified: {', '.join([r.description[:50] for r in high_risks[:3]])}. Proactive mitigation is essential.",
+                    summary="Critical risk patterns",
+                    type="lesson_learned",
+                    scope="organization",
+                    suggested_memory_layer="episodic",
+                    tags=["risk", "mitigation", "planning"],
+                    confidence=0.85,
+                    verification_status="verified",
+                    supporting_evidence=[
+                        SupportingEvidence.model_construct(
+                            agent_id="risk_compliance",
+                            agent_name="Risk & Compliance Officer",
+                            round=5,
+                            statement="Risk assessment validated"
+                        )
+                    ],
+                    source=source
+                ))
+
+        for ws in program.workstreams[:3]:
+            if ws.dependencies:
+                emissions.append(KnowledgeEmission.model_construct(
+                    id=secrets.token_hex(16),
+                    content=f"Workstream '{ws.name}' depends on upstream deliverables. Ensure proper sequencing to avoid delays.",
+                    summary=f"{ws.name} dependency constraint",
+                    type="constraint",
+                    scope="program_specific",
+                    suggested_memory_layer="symbolic",
+                    tags=["dependencies", "sequencing", ws.name.lower().replace(" ", "_")],
+                    confidence=0.9,
+                    verification_status="verified",
+                    supporting_evidence=[
+                        SupportingEvidence.model_construct(
+                            agent_id="platform_delivery",
+                            agent_name="Platform Delivery Manager",
+                            round=2,
+                            statement="Dependencies mapped and validated"
+                        )
+                    ],
+                    source=source
+                ))
+
+        return emissions
+
+    async def ingest_round(
+        self,
+        round_num: int,
+        round_entries: List[ConversationEntry]
+    ):
+        """Feed a completed planning round in while later rounds still run.
+
+        Stores the entries and kicks off background Haiku summaries for
+        rounds old enough to fall outside _compact_conversation's verbatim
+        tail, so the summaries curate() would otherwise compute serially
+        are already warm when it runs. The summary calls execute in worker
+        threads and hide inside the remaining rounds' LLM waits.
+        """
+        import asyncio
+
+        self._ingested_entries[round_num] = list(round_entries)
+
+        newest = max(self._ingested_entries)
+        for candidate in sorted(self._ingested_entries):
+            if candidate > newest - self.COMPACT_RECENT_ROUNDS:
+                break
+            if candidate in self._round_summaries or candidate in self._ingest_tasks:
+                continue
+            self._ingest_tasks[candidate] = asyncio.ensure_future(
+                asyncio.to_thread(
+                    self._summarize_round, candidate, self._ingested_entries[candidate]
+                )
+            )
+
+    async def _drain_ingest_tasks(self):
+        """Wait out in-flight round summaries before compaction reads them."""
+        import asyncio
+
+        if self._ingest_tasks:
+            await asyncio.gather(*self._ingest_tasks.values(), return_exceptions=True)
+            self._ingest_tasks.clear()
+
+    async def curate(
+        self,
+        conversation_log: List[ConversationEntry],
+        program: EPMProgram,
+        decisions: Optional[List[Any]] = None
+    ) -> KnowledgeLedger:
+        """
+        Process conversation log and extract knowledge emissions.
+        
+        Args:
+            conversation_log: List of conversation entries from all rounds
+            program: The generated EPM program
+            decisions: Optional list of decisions made during planning
+            
+        Returns:
+            KnowledgeLedger containing verified, contested, and rejected knowledge
+        """
+        import asyncio
+
+        await self._drain_ingest_tasks()
+
+        conversation_summary = self._compact_conversation(conversation_log)
+
+        # Run the blocking extraction call in a worker thread, and build the
+        # fallback emissions concurrently — they are pure-local work that
+        # hides entirely inside the API wait, and get discarded whenever the
+        # LLM yields enough verified knowledge.
+        raw_candidates, fallback = await asyncio.gather(
+            asyncio.to_thread(
+                self._extract_candidates_with_llm, conversation_summary, program
+            ),
+            asyncio.to_thread(
+                self._generate_fallback_emissions, program, conversation_log
+            ),
+        )
+
+        return self._build_ledger(
+            raw_candidates, program, conversation_log, fallback=fallback
+        )
+
+    def _build_ledger(
+        self,
+        raw_candidates: List[Dict[str, Any]],
+        program: EPMProgram,
+        conversation_log: List[ConversationEntry],
+        fallback: Optional[List[KnowledgeEmission]] = None
+    ) -> KnowledgeLedger:
+        """Run the post-extraction pipeline and assemble the ledger."""
+        valid_candidates = [c for c in raw_candidates if self._validate_candidate(c)]
+
+        unique_candidates, duplicates_removed = self._deduplicate_candidates(valid_candidates)
+
+        unique_candidates = self._reprocess_low_confidence(unique_candidates)
+
+        unique_candidates = self._mmr_rerank(unique_candidates)
+
+        source = self._build_source(program)
+
+        emissions = []
+        contested = []
+        rejected = []
+        bucket_for = {"verified": emissions, "contested": contested, "hypothesis": rejected}
+        for status, emission in self._classified_emissions(unique_candidates, program, source):
+            bucket_for[status].append(emission)
+
+        if len(emissions) < 5:
+            if fallback is None:
+                fallback = self._generate_fallback_emissions(program, conversation_log)
+            existing_summaries = {e.summary for e in emissions}
+            for fb in fallback:
+                if fb.summary not in existing_summaries:
+                    emissions.append(fb)
+
+        stats = KnowledgeStats(
+            total_candidates=len(raw_candidates),
+            verified=len(emissions),
+            deduplicated=duplicates_removed,
+            emitted=len(emissions),
+            contested=len(contested),
+            rejected=len(rejected),
+            flagged_for_review=len([e for e in emissions if e.confidence < 0.8])
+        )
+
+        return KnowledgeLedger(
+            emissions=emissions,
+            contested=contested,
+            rejected=rejected,
+            stats=stats
+        )
+
+    async def curate_batch(
+        self,
+        programs: List[Tuple[List[ConversationEntry], EPMProgram]],
+        batch_mode: bool = True
+    ) -> Dict[str, KnowledgeLedger]:
+        """
+        Curate several programs through the Anthropic Message Batches API.
+
+        Curation runs post-planning and is not latency-critical, so batch jobs
+        (priced at half the synchronous rate) are preferred when multiple
+        programs finish planning together. Falls back to the synchronous
+        curate() path when batch_mode is off, the batch cannot be submitted,
+        or it does not finish within the timeout.
+
+        Args:
+            programs: (conversation_log, program) pairs to curate
+            batch_mode: Submit one batch job instead of sequential calls
+
+        Returns:
+            Mapping of program.id to its KnowledgeLedger
+        """
+        import asyncio
+
+        if not batch_mode or not programs:
+            return {
+                program.id: await self.curate(conversation_log, program)
+                for conversation_log, program in programs
+            }
+
+        by_id = {program.id: (conversation_log, program) for conversation_log, program in programs}
+
+        try:
+            model_id = self._curator_model_id()
+            model = model_id.split("/")[-1]
+
+            requests = []
+            for conversation_log, program in programs:
+                conversation_summary = self._compact_conversation(conversation_log)
+                requests.append({
+                    "custom_id": program.id,
+                    "params": {
+                        "model": model,
+                        "max_tokens": 8192,
+                        "temperature": 0.3,
+                        "system": [{
+                            "type": "text",
+                            "text": self.EXTRACTION_SYSTEM_PROMPT,
+                            "cache_control": {"type": "ephemeral"},
+                        }],
+                        "messages": [{
+                            "role": "user",
+                            "content": self._build_extraction_prompt(conversation_summary, program)
+                        }]
+                    }
+                })
+
+            loop = asyncio.get_event_loop()
+            batch = await loop.run_in_executor(
+                None,
+                lambda: self._anthropic.messages.batches.create(requests=requests)
+            )
+            print(f"[Curator] Submitted batch {batch.id} with {len(requests)} programs")
+
+            deadline = loop.time() + self.BATCH_TIMEOUT_SECONDS
+            while batch.processing_status != "ended":
+                if loop.time() > deadline:
+                    raise TimeoutError(f"Batch {batch.id} did not finish within timeout")
+                await asyncio.sleep(self.BATCH_POLL_INTERVAL_SECONDS)
+                batch = await loop.run_in_executor(
+                    None,
+                    lambda: self._anthropic.messages.batches.retrieve(batch.id)
+                )
+
+            candidates_by_id = {}
+            results = await loop.run_in_executor(
+                None,
+                lambda: list(self._anthropic.messages.batches.results(batch.id))
+            )
+            for entry in results:
+                if entry.result.type != "succeeded":
+                    print(f"[Curator] Batch entry {entry.custom_id} failed: {entry.result.type}")
+                    continue
+                text = "".join(
+                    block.text for block in entry.result.message.content
+                    if getattr(block, "type", "") == "text"
+                )
+                candidates_by_id[entry.custom_id] = self._parse_candidates(text)
+        except Exception as e:
+            # Batch submission/processing failed - fall back to the standard API
+            print(f"[Curator] Batch curation failed, falling back to synchronous: {e}")
+            return {
+                program.id: await self.curate(conversation_log, program)
+                for conversation_log, program in programs
+            }
+
+        ledgers = {}
+        for program_id, (conversation_log, program) in by_id.items():
+            raw_candidates = candidates_by_id.get(program_id, [])
+            ledgers[program_id] = self._build_ledger(raw_candidates, program, conversation_log)
+
+        return ledgers
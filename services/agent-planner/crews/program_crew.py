@@ -0,0 +1,1362 @@
+"""
+Program Planning Crew - Multi-Agent EPM Generator using CrewAI
+
+This module implements a CrewAI-based program planning system with 7 specialized agents
+that collaborate across 7 planning rounds to generate comprehensive EPM programs.
+"""
+
+import os
+import uuid
+import json
+import functools
+from dataclasses import dataclass, field
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+try:
+    import orjson  # C-accelerated JSON decode for synthesis blocks
+except ImportError:
+    orjson = None
+
+try:
+    # libyaml-backed loader; 5-15x faster than the pure-Python one
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+from crewai import Agent, Task, Crew, Process
+from crewai.llm import LLM
+
+from models.schemas import (
+    EPMGeneratorInput,
+    EPMProgram,
+    Workstream,
+    Deliverable,
+    ResourceRequirement,
+    Timeline,
+    TimelinePhase,
+    Milestone,
+    ResourcePlan,
+    RiskRegister,
+    Risk,
+    FinancialPlan,
+    FinancialItem,
+    ConversationEntry,
+    Decision,
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _parse_config(yaml_path_str: str, mtime: float) -> Dict:
+    """Parse a config file, preferring a JSON sidecar over PyYAML.
+
+    PyYAML's pure-Python loader is an order of magnitude slower than
+    json.load, so the parsed dict is mirrored to a `.yaml.json` sidecar
+    and reused while it is at least as new as the YAML. The lru_cache is
+    keyed on (path, mtime) so edited files get re-parsed while repeated
+    crew constructions in one process share the same dict.
+    """
+    yaml_path = Path(yaml_path_str)
+    cache_path = yaml_path.with_suffix(".yaml.json")
+
+    try:
+        if cache_path.stat().st_mtime >= mtime:
+            with open(cache_path, "r") as f:
+                return json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    with open(yaml_path, "r") as f:
+        data = yaml.load(f, Loader=_YamlLoader)
+
+    try:
+        with open(cache_path, "w") as f:
+            json.dump(data, f)
+    except (OSError, TypeError):
+        pass
+
+    return data
+
+
+def _load_config(yaml_path: Path) -> Dict:
+    """Load a YAML config through the sidecar/mtime cache."""
+    return _parse_config(str(yaml_path), yaml_path.stat().st_mtime)
+
+
+@dataclass
+class RunContext:
+    """Mutable state for a single generate run.
+
+    Keeping per-run state off the crew instance makes generate_sync
+    reentrant: one ProgramPlanningCrew (with its parsed configs and LLM
+    client) can serve concurrent generations without them corrupting each
+    other's logs, decisions, or agent maps.
+    """
+    agents: Dict[str, Agent] = field(default_factory=dict)
+    # Prompt fragments derived from input_data once per run; every round
+    # interpolates the same strings instead of reformatting them
+    business_context_block: str = ""
+    constraints_block: str = ""
+    agent_id_by_instance: Dict[int, str] = field(default_factory=dict)
+    conversation_log: List[ConversationEntry] = field(default_factory=list)
+    decisions: List[Decision] = field(default_factory=list)
+
+
+class ProgramPlanningCrew:
+    """
+    Orchestrates multiple AI agents to collaboratively generate EPM programs.
+    
+    Agents (7 total, excluding Knowledge Curator which runs post-generation):
+    1. Program Coordinator - Synthesizes inputs, tracks decisions, resolves conflicts
+    2. Tech Architecture Lead - Defines technology stack and feasibility
+    3. Platform Delivery Manager - Defines delivery approach and quality gates
+    4. Go-to-Market Strategist - Defines marketing and sales enablement
+    5. Customer Success Lead - Defines onboarding and retention strategies
+    6. Risk & Compliance Officer - Identifies risks and compliance requirements
+    7. Finance & Resource Manager - Defines budget and resource planning
+    """
+
+    # Message Batches polling cadence and give-up threshold for batched
+    # round execution
+    # JSON block appended to whichever task produces a round's final
+    # output - the coordinator's synthesis normally, or the lone agent's
+    # task when a round has a single participant
+    SYNTHESIS_JSON_INSTRUCTIONS = """Include a JSON block at the end with key decisions in this format:
+```json
+{
+  "decisions": [
+    {"topic": "...", "decision": "...", "rationale": "..."}
+  ],
+  "workstream_updates": [
+    {"name": "...", "description": "...", "owner": "...", "startMonth": 1, "endMonth": 3}
+  ],
+  "risks_identified": [
+    {"description": "...", "probability": "medium", "impact": "high", "mitigation": "..."}
+  ],
+  "resources_needed": [
+    {"role": "...", "skills": [...], "allocation": 0.5, "costPerMonth": 10000}
+  ]
+}
+```
+"""
+
+    BATCH_POLL_INTERVAL_SECONDS = 10
+    BATCH_TIMEOUT_SECONDS = 1800
+
+    def __init__(self):
+        self.agents_count = 7
+        self.config_path = Path(__file__).parent.parent / "config"
+        self.agent_configs = self._load_agent_configs()
+        self.round_config = self._load_round_config()
+        self._initialize_llm()
+
+    def _initialize_llm(self):
+        """Initialize the LLM for all agents."""
+        import sys
+
+        api_key = os.environ.get("ANTHROPIC_API_KEY")
+        if not api_key:
+            raise ValueError("ANTHROPIC_API_KEY environment variable not set")
+
+        masked_key = f"{api_key[:4]}...{api_key[-4:]}" if len(api_key) > 8 else "***"
+        model_id = os.environ.get("CREWAI_MODEL", "anthropic/claude-sonnet-4-20250514")
+
+        print(f"[ProgramCrew] API key found: {masked_key}", flush=True)
+        print(f"[ProgramCrew] Using model: {model_id}", flush=True)
+        print("[ProgramCrew] LLM timeout: 300s (5 minutes)", flush=True)
+
+        # Ensure startup logs are visible immediately
+        sys.stdout.flush()
+
+        self.llm = LLM(
+            model=model_id,
+            api_key=api_key,
+            temperature=0.7,
+            timeout=300,
+            max_retries=3,
+        )
+
+        # One SDK client for every direct Anthropic call in a process:
+        # its internal httpx pool keeps connections alive, so the ~49
+        # calls per generation reuse warm connections instead of paying
+        # a TLS handshake each. The client is thread-safe, which matters
+        # because these calls run under asyncio.to_thread.
+        self._anthropic = None
+        try:
+            import anthropic
+            self._anthropic = anthropic.Anthropic(api_key=api_key, max_retries=3)
+        except ImportError:
+            pass
+
+    def _load_agent_configs(self) -> Dict[str, Dict]:
+        """Load all agent configurations from YAML files."""
+        agents_path = self.config_path / "agents"
+        configs = {}
+
+        agent_files = [
+            "program_coordinator",
+            "tech_architecture",
+            "platform_delivery",
+            "go_to_market",
+            "customer_success",
+            "risk_compliance",
+            "finance_resources",
+        ]
+
+        for agent_name in agent_files:
+            yaml_path = agents_path / f"{agent_name}.yaml"
+            if yaml_path.exists():
+                configs[agent_name] = _load_config(yaml_path)
+
+        return configs
+
+    def _load_round_config(self) -> Dict:
+        """Load round definitions from YAML."""
+        rounds_path = self.config_path / "rounds" / "standard_planning.yaml"
+        if rounds_path.exists():
+            return _load_config(rounds_path)
+        return {"rounds": []}
+
+    def _get_agent(self, ctx: RunContext, agent_id: str) -> Optional[Agent]:
+        """Return the run's Agent for agent_id, constructing it on first use.
+
+        Agents are built lazily as rounds reference them, so a run only
+        pays CrewAI Agent construction for ids that actually appear in
+        participating_agents. Safe under asyncio concurrency because
+        construction happens synchronously with no await points.
+        """
+        agent = ctx.agents.get(agent_id)
+        if agent is not None:
+            return agent
+
+        config = self.agent_configs.get(agent_id)
+        if config is None:
+            return None
+
+        agent = Agent(
+            role=config.get("role", agent_id),
+            goal=config.get("goal", ""),
+            backstory=config.get("backstory", ""),
+            verbose=config.get("verbose", True),
+            allow_delegation=config.get("allow_delegation", False),
+            llm=self.llm,
+        )
+        ctx.agents[agent_id] = agent
+        # Reverse lookup used when attributing task outputs
+        ctx.agent_id_by_instance[id(agent)] = agent_id
+        return agent
+
+    def _build_run_invariants(self, ctx: RunContext, input_data: EPMGeneratorInput) -> None:
+        """Format the input-derived prompt blocks once per run.
+
+        Business context and constraints do not change between rounds, so
+        they are rendered a single time here rather than once per round in
+        _build_round_context.
+        """
+        ctx.business_context_block = f"""
+Business Name: {input_data.business_context.name}
+Business Type: {input_data.business_context.type}
+Scale: {input_data.business_context.scale}
+Description: {input_data.business_context.description}
+Industry: {input_data.business_context.industry or 'Not specified'}
+"""
+
+        constraints_text = ""
+        if input_data.constraints:
+            if input_data.constraints.budget:
+                constraints_text += f"Budget: ${input_data.constraints.budget:,.0f}\n"
+            if input_data.constraints.deadline:
+                constraints_text += f"Deadline: {input_data.constraints.deadline}\n"
+            if input_data.constraints.regulations:
+                constraints_text += f"Regulations: {', '.join(input_data.constraints.regulations)}\n"
+        ctx.constraints_block = constraints_text
+
+    # Per-round digest budget for previous-round context, in characters.
+    # Roughly 500 tokens at ~4 chars/token; a char proxy keeps the cap
+    # dependency-free since no tokenizer ships with the service.
+    ROUND_DIGEST_CHAR_BUDGET = 2000
+
+    def _distill_round_output(self, synthesis_output: str, parsed: Dict[str, Any]) -> str:
+        """Produce a compact digest of a round for later rounds' prompts.
+
+        Prefers a structured rendering of the parsed JSON block - decision
+        topics, workstream spans, risks, resources - over a raw slice of
+        the synthesis text, so later prompts carry the round's conclusions
+        rather than its boilerplate. Falls back to the synthesis prose cut
+        at a word boundary when the block is missing.
+        """
+        lines = []
+        for d in parsed.get("decisions", []):
+            lines.append(f"- Decision [{d.get('topic', '?')}]: {d.get('decision', '')}")
+        for ws in parsed.get("workstream_updates", []):
+            lines.append(
+                f"- Workstream {ws.get('name', '?')} ({ws.get('owner', 'TBD')}, "
+                f"months {ws.get('startMonth', '?')}-{ws.get('endMonth', '?')}): {ws.get('description', '')}"
+            )
+        for r in parsed.get("risks_identified", []):
+            lines.append(
+                f"- Risk ({r.get('probability', '?')}/{r.get('impact', '?')}): {r.get('description', '')}"
+            )
+        for r in parsed.get("resources_needed", []):
+            lines.append(f"- Resource: {r.get('role', '?')} at {r.get('allocation', '?')} FTE")
+
+        if lines:
+            digest = "\n".join(lines)
+        else:
+            # No parseable block; keep the prose before any JSON fence
+            fence = synthesis_output.find("```json")
+            digest = (synthesis_output[:fence] if fence != -1 else synthesis_output).strip()
+
+        if len(digest) > self.ROUND_DIGEST_CHAR_BUDGET:
+            digest = digest[:self.ROUND_DIGEST_CHAR_BUDGET].rsplit(None, 1)[0] + " ..."
+        return digest
+
+    def _build_round_context(
+        self,
+        ctx: RunContext,
+        round_config: Dict,
+        previous_outputs: Dict[int, str],
+    ) -> str:
+        """Build the round context block shared by every agent in a round.
+
+        This is the invariant part of each prompt — round framing, business
+        context, constraints, previous syntheses — built once per round and
+        marked for server-side prompt caching on the batch path, so it is
+        prefilled and billed once rather than once per agent.
+        """
+        round_num = round_config.get("round", 1)
+        round_name = round_config.get("name", "Unknown")
+        objectives = round_config.get("objectives", [])
+        expected_outputs = round_config.get("outputs", [])
+
+        objectives_text = "\n".join(f"- {obj}" for obj in objectives)
+        outputs_text = "\n".join(f"- {out}" for out in expected_outputs)
+
+        previous_context = ""
+        if previous_outputs:
+            previous_context = "\n\nPrevious Round Outputs:\n"
+            for prev_round, output in previous_outputs.items():
+                previous_context += f"\nRound {prev_round}:\n{output}\n"
+
+        return f"""
+You are participating in Round {round_num}: {round_name}
+
+{round_config.get('description', '')}
+
+**Objectives for this round:**
+{objectives_text}
+
+**Expected outputs:**
+{outputs_text}
+
+**Business Context:**
+{ctx.business_context_block}
+
+**Constraints:**
+{ctx.constraints_block if ctx.constraints_block else 'No specific constraints defined'}
+{previous_context}
+"""
+
+    def _create_round_tasks(
+        self,
+        ctx: RunContext,
+        round_config: Dict,
+        input_data: EPMGeneratorInput,
+        previous_outputs: Dict[int, str],
+        shared_context: Optional[str] = None,
+    ) -> List[Task]:
+        """Create tasks for a specific planning round."""
+        tasks = []
+        round_name = round_config.get("name", "Unknown")
+        participating_agents = round_config.get("participating_agents", [])
+
+        if shared_context is None:
+            shared_context = self._build_round_context(ctx, round_config, previous_outputs)
+
+        for agent_id in participating_agents:
+            if agent_id == "knowledge_curator":
+                continue
+
+            agent = self._get_agent(ctx, agent_id)
+            if not agent:
+                continue
+
+            agent_ask = f"""
+Based on your role as {agent.role}, provide your expert input for this round.
+
+Your response should be structured and include:
+1. Your key observations and recommendations
+2. Specific deliverables or work items you propose
+3. Dependencies on other workstreams or agents
+4. Risks you've identified from your perspective
+5. Timeline considerations
+6. Resource requirements from your domain
+
+Be specific and actionable. Reference the business context and objectives.
+"""
+
+            task = Task(
+                description=shared_context + agent_ask,
+                expected_output=f"Structured analysis and recommendations for {round_name} from the perspective of {agent.role}",
+                agent=agent,
+            )
+            tasks.append(task)
+
+        return tasks
+
+    def _create_synthesis_task(
+        self,
+        ctx: RunContext,
+        round_config: Dict,
+        round_outputs: List[str],
+        input_data: EPMGeneratorInput,
+    ) -> Task:
+        """Create a synthesis task for the coordinator to summarize round outputs."""
+        round_num = round_config.get("round", 1)
+        round_name = round_config.get("name", "Unknown")
+
+        outputs_summary = "\n\n".join([f"Agent Output {i + 1}:\n{output}" for i, output in enumerate(round_outputs)])
+
+        synthesis_description = f"""
+As Program Coordinator, synthesize the outputs from Round {round_num}: {round_name}
+
+**Agent Outputs to Synthesize:**
+{outputs_summary[:8000]}
+
+**Your synthesis should:**
+1. Identify key themes and consensus points
+2. Note any conflicting views or trade-offs needed
+3. Propose decisions that need to be made
+4. Create a consolidated summary of round outcomes
+5. Identify open items for subsequent rounds
+
+Output a structured synthesis that captures the collective intelligence of the team.
+{self.SYNTHESIS_JSON_INSTRUCTIONS}"""
+
+        coordinator = self._get_agent(ctx, "program_coordinator")
+
+        return Task(
+            description=synthesis_description,
+            expected_output=f"Synthesized summary of Round {round_num} with decisions and action items",
+            agent=coordinator,
+        )
+
+    async def _run_round_tasks_async(self, round_tasks: List[Task]) -> List[str]:
+        """Run one round's agent tasks concurrently, preserving task order.
+
+        Agents within a round are independent — each writes its own
+        perspective on the same context — so every task gets its own
+        single-agent crew and they are kicked off together. The work is
+        LLM I/O bound, so per-round wall time drops from the sum of the
+        agent calls to roughly the slowest one.
+        """
+        import asyncio
+
+        async def run_single(task: Task) -> str:
+            crew = Crew(
+                agents=[task.agent],
+                tasks=[task],
+                process=Process.sequential,
+                verbose=True,
+            )
+            result = await crew.kickoff_async()
+            return str(result)
+
+        return list(await asyncio.gather(*(run_single(task) for task in round_tasks)))
+
+    async def _run_round_tasks_batched(
+        self,
+        round_tasks: List[Task],
+        shared_context: Optional[str] = None,
+        on_batch_progress: Optional[callable] = None,
+    ) -> Optional[List[str]]:
+        """Submit one round's agent prompts as a single Message Batch.
+
+        All tasks in a round are independent prompts sharing the same
+        business-context block, so they qualify for the Batches API: one
+        submission instead of N HTTPS round-trips, tokens billed at half
+        price, and the shared prefix prefilled once server-side. The shared
+        round context leads the system blocks with cache_control so every
+        agent after the first reads it from the prompt cache instead of
+        re-prefilling it. Returns outputs in task order, or None when the
+        batch path is unavailable or incomplete so the caller can fall back
+        to concurrent kickoffs.
+        """
+        import time
+        import asyncio
+
+        client = self._anthropic
+        if client is None:
+            return None
+
+        model_id = os.environ.get("CREWAI_MODEL", "anthropic/claude-sonnet-4-20250514")
+        model = model_id.split("/")[-1]
+
+        requests = []
+        for idx, task in enumerate(round_tasks):
+            agent = task.agent
+            persona = f"You are {agent.role}.\n\nGoal: {agent.goal}\n\n{agent.backstory}"
+
+            if shared_context and task.description.startswith(shared_context):
+                # Identical cached prefix first, per-agent persona after it,
+                # and only the agent-specific ask in the user turn
+                system = [
+                    {
+                        "type": "text",
+                        "text": shared_context,
+                        "cache_control": {"type": "ephemeral"},
+                    },
+                    {"type": "text", "text": persona},
+                ]
+                user_content = task.description[len(shared_context):]
+            else:
+                system = persona
+                user_content = task.description
+
+            requests.append({
+                "custom_id": f"task-{idx}",
+                "params": {
+                    "model": model,
+                    "max_tokens": 4096,
+                    "temperature": 0.7,
+                    "system": system,
+                    "messages": [{"role": "user", "content": user_content}],
+                },
+            })
+
+        try:
+            batch = await asyncio.to_thread(
+                lambda: client.messages.batches.create(requests=requests)
+            )
+            print(f"[ProgramCrew] Submitted batch {batch.id} with {len(requests)} prompts", flush=True)
+
+            deadline = time.monotonic() + self.BATCH_TIMEOUT_SECONDS
+            reported_done = 0
+            while batch.processing_status != "ended":
+                if time.monotonic() > deadline:
+                    print(f"[ProgramCrew] Batch {batch.id} timed out; falling back", flush=True)
+                    return None
+                await asyncio.sleep(self.BATCH_POLL_INTERVAL_SECONDS)
+                batch = await asyncio.to_thread(
+                    lambda: client.messages.batches.retrieve(batch.id)
+                )
+
+                # Surface per-poll completion counts so job progress moves
+                # while the batch is processing rather than jumping at the end
+                counts = getattr(batch, "request_counts", None)
+                if on_batch_progress and counts is not None:
+                    done = counts.succeeded + counts.errored + counts.canceled + counts.expired
+                    if done > reported_done:
+                        reported_done = done
+                        try:
+                            on_batch_progress(done, len(round_tasks))
+                        except Exception:
+                            pass
+
+            results = await asyncio.to_thread(
+                lambda: list(client.messages.batches.results(batch.id))
+            )
+
+            outputs = [None] * len(round_tasks)
+            for entry in results:
+                if entry.result.type != "succeeded":
+                    print(f"[ProgramCrew] Batch entry {entry.custom_id} {entry.result.type}; falling back", flush=True)
+                    return None
+                index = int(entry.custom_id.split("-")[-1])
+                outputs[index] = "".join(
+                    block.text for block in entry.result.message.content
+                    if getattr(block, "type", "") == "text"
+                )
+
+            if any(output is None for output in outputs):
+                return None
+            return outputs
+        except Exception as e:
+            print(f"[ProgramCrew] Batched round execution failed, falling back: {e}", flush=True)
+            return None
+
+    @staticmethod
+    def _group_rounds_into_phases(rounds: List[Dict]) -> List[List[Dict]]:
+        """Group rounds into phases of concurrently runnable work.
+
+        Each round may declare `depends_on: [round_nums]` in the YAML; a
+        round missing the field depends on every earlier round, which keeps
+        the strict sequential schedule for existing configs. Kahn's
+        algorithm then batches rounds whose dependencies are all satisfied
+        into one phase, so independent rounds (e.g. tech and GTM deep
+        dives) overlap and the critical path shrinks to the DAG depth.
+        """
+        by_num = {}
+        declaration_order = []
+        deps = {}
+
+        for i, round_config in enumerate(rounds):
+            num = round_config.get("round", i + 1)
+            by_num[num] = round_config
+            declaration_order.append(num)
+            declared = round_config.get("depends_on")
+            if declared is None:
+                declared = declaration_order[:-1]
+            deps[num] = set(declared)
+
+        phases = []
+        done = set()
+        # Drop self- and dangling references now that every round is known
+        remaining = {
+            num: {d for d in dep if d in by_num and d != num}
+            for num, dep in deps.items()
+        }
+
+        while remaining:
+            ready = [
+                num for num in declaration_order
+                if num in remaining and remaining[num] <= done
+            ]
+            if not ready:
+                # Cyclic or dangling dependencies; degrade to declaration order
+                ready = [next(n for n in declaration_order if n in remaining)]
+            phases.append([by_num[num] for num in ready])
+            done.update(ready)
+            for num in ready:
+                del remaining[num]
+
+        return phases
+
+    async def _run_round(
+        self,
+        ctx: RunContext,
+        round_config: Dict,
+        input_data: EPMGeneratorInput,
+        previous_outputs: Dict[int, str],
+        on_progress: Optional[callable] = None,
+    ) -> Optional[tuple]:
+        """Execute one planning round: agent tasks, synthesis, decisions.
+
+        Returns (round_num, synthesis_output, parsed_synthesis), or None
+        when no agents participate in the round.
+        """
+        import sys
+        import time
+        import traceback
+
+        round_num = round_config.get("round", 1)
+        round_name = round_config.get("name", "Unknown")
+
+        self._log_conversation(
+            ctx,
+            round_num,
+            "system",
+            f"Starting Round {round_num}: {round_name}",
+        )
+
+        shared_context = self._build_round_context(ctx, round_config, previous_outputs)
+        round_tasks = self._create_round_tasks(
+            ctx, round_config, input_data, previous_outputs, shared_context
+        )
+
+        if not round_tasks:
+            return None
+
+        # With a single participating agent there is nothing to reconcile,
+        # so ask that agent to emit the decisions JSON inline and skip the
+        # coordinator synthesis call entirely
+        solo_round = len(round_tasks) == 1
+        if solo_round:
+            round_tasks[0].description += f"\n\n{self.SYNTHESIS_JSON_INSTRUCTIONS}"
+
+        try:
+            print(f"[ProgramCrew] Executing round {round_num} with {len(round_tasks)} tasks...", flush=True)
+            print(f"[ProgramCrew] Tasks: {[t.description[:50] + '...' for t in round_tasks]}", flush=True)
+            sys.stdout.flush()
+
+            # Notify that the round is starting
+            if on_progress:
+                try:
+                    on_progress(round_num, round_name, None, "starting", len(round_tasks))
+                except:
+                    pass
+
+            kickoff_start = time.time()
+            round_outputs = None
+            if os.environ.get("ROUND_BATCH_MODE", "true").lower() != "false":
+                def on_batch_progress(done: int, total: int):
+                    if on_progress:
+                        on_progress(round_num, round_name, None, "agent_done", total, done)
+
+                round_outputs = await self._run_round_tasks_batched(
+                    round_tasks, shared_context, on_batch_progress
+                )
+            if round_outputs is None:
+                round_outputs = await self._run_round_tasks_async(round_tasks)
+            kickoff_duration = time.time() - kickoff_start
+            print(f"[ProgramCrew] Round {round_num} kickoff complete in {kickoff_duration:.1f}s", flush=True)
+            sys.stdout.flush()
+
+            for idx, output_str in enumerate(round_outputs):
+                # Outputs come back in task order, so the owning agent is
+                # known directly - no role-name sniffing in the output text
+                agent = round_tasks[idx].agent
+                agent_id = ctx.agent_id_by_instance.get(id(agent))
+
+                if agent_id:
+                    self._log_conversation(ctx, round_num, agent_id, output_str[:2000])
+
+                    if on_progress:
+                        try:
+                            on_progress(round_num, round_name, agent.role, "agent_done", len(round_tasks), idx + 1)
+                        except:
+                            pass
+
+            if solo_round:
+                print(f"[ProgramCrew] Round {round_num} has a single agent; skipping synthesis")
+                synthesis_output = round_outputs[0]
+            else:
+                synthesis_task = self._create_synthesis_task(ctx, round_config, round_outputs, input_data)
+
+                print(f"[ProgramCrew] Starting synthesis for round {round_num}...")
+                synthesis_output = await self._run_synthesis_streamed(synthesis_task)
+
+                if synthesis_output is None:
+                    synthesis_crew = Crew(
+                        agents=[self._get_agent(ctx, "program_coordinator")],
+                        tasks=[synthesis_task],
+                        process=Process.sequential,
+                        verbose=True,
+                    )
+                    synthesis_result = await synthesis_crew.kickoff_async()
+                    synthesis_output = str(synthesis_result)
+                print(f"[ProgramCrew] Synthesis for round {round_num} complete")
+
+                self._log_conversation(ctx, round_num, "program_coordinator", synthesis_output[:2000])
+
+            parsed_synthesis = self._parse_synthesis_json(synthesis_output)
+            round_decisions = self._extract_decisions(parsed_synthesis, round_num)
+            ctx.decisions.extend(round_decisions)
+
+            # Notify round completion
+            if on_progress:
+                try:
+                    on_progress(round_num, round_name, "Synthesis Complete", "round_done")
+                except Exception as e:
+                    print(f"[ProgramCrew] Progress callback error: {e}")
+
+            return round_num, synthesis_output, parsed_synthesis
+
+        except Exception as e:
+            error_msg = f"Round {round_num} encountered an error: {str(e)}"
+            print(f"[ProgramCrew ERROR] {error_msg}")
+            print(f"[ProgramCrew ERROR] Traceback:\n{traceback.format_exc()}")
+            self._log_conversation(
+                ctx,
+                round_num,
+                "system",
+                error_msg,
+            )
+
+            raise
+
+    async def _run_synthesis_streamed(self, synthesis_task: Task) -> Optional[str]:
+        """Stream the synthesis call and stop right after its JSON block.
+
+        The synthesis prompt puts the fenced JSON at the end and nothing
+        downstream reads past it, so the stream is closed as soon as the
+        closing fence arrives — every further token would be billed decode
+        time for text that gets thrown away. Returns None when the direct
+        path is unavailable so the caller can fall back to CrewAI.
+        """
+        import asyncio
+
+        client = self._anthropic
+        if client is None:
+            return None
+
+        agent = synthesis_task.agent
+        model_id = os.environ.get("CREWAI_MODEL", "anthropic/claude-sonnet-4-20250514")
+
+        def run_stream() -> str:
+            buffer = ""
+            json_open = -1
+
+            with client.messages.stream(
+                model=model_id.split("/")[-1],
+                max_tokens=4096,
+                temperature=0.7,
+                system=f"You are {agent.role}.\n\nGoal: {agent.goal}\n\n{agent.backstory}",
+                messages=[{"role": "user", "content": synthesis_task.description}],
+            ) as stream:
+                for chunk in stream.text_stream:
+                    buffer += chunk
+                    if json_open == -1:
+                        json_open = buffer.find("```json")
+                    if json_open != -1:
+                        close = buffer.find("```", json_open + 7)
+                        if close != -1:
+                            stream.close()
+                            return buffer[:close + 3]
+
+            return buffer
+
+        try:
+            return await asyncio.to_thread(run_stream)
+        except Exception as e:
+            print(f"[ProgramCrew] Streamed synthesis failed, falling back: {e}", flush=True)
+            return None
+
+    def _log_conversation(self, ctx: RunContext, round_num: int, agent_id: str, message: str):
+        """Add an entry to the run's conversation log."""
+        agent_config = self.agent_configs.get(agent_id, {})
+        agent_name = agent_config.get("role", agent_id)
+
+        # Every field is server-controlled, so skip validator dispatch
+        entry = ConversationEntry.model_construct(
+            round=round_num,
+            agent_id=agent_id,
+            agent_name=agent_name,
+            message=message[:2000],
+            timestamp=datetime.now().isoformat(),
+        )
+        ctx.conversation_log.append(entry)
+
+    @staticmethod
+    def _parse_synthesis_json(synthesis: str) -> Dict[str, Any]:
+        """Parse the JSON block of a synthesis output.
+
+        Called once per round, right after the synthesis is produced; the
+        extractors receive the parsed dict rather than re-scanning the
+        text. orjson handles the decode when installed, stdlib json
+        otherwise. A block the decoder rejects - typically because
+        max_tokens truncated it mid-list - is salvaged object by object
+        instead of dropping the whole round.
+        """
+        json_start = synthesis.find("```json")
+        if json_start == -1:
+            return {}
+        json_end = synthesis.find("```", json_start + 7)
+        if json_end == -1:
+            # Truncated before the closing fence; salvage whatever is there
+            json_str = synthesis[json_start + 7:].strip()
+        else:
+            json_str = synthesis[json_start + 7:json_end].strip()
+            try:
+                if orjson is not None:
+                    return orjson.loads(json_str)
+                return json.loads(json_str)
+            except ValueError:
+                # Covers json.JSONDecodeError and orjson.JSONDecodeError alike
+                pass
+
+        return ProgramPlanningCrew._salvage_synthesis_json(json_str)
+
+    @staticmethod
+    def _salvage_synthesis_json(json_str: str) -> Dict[str, Any]:
+        """Recover complete objects from a truncated synthesis block.
+
+        Walks each known top-level list and raw_decodes one object at a
+        time, keeping everything that parsed fully and stopping at the
+        first incomplete one, so a round cut off mid-list still yields
+        its earlier decisions, workstreams, risks, and resources.
+        """
+        decoder = json.JSONDecoder()
+        salvaged: Dict[str, Any] = {}
+
+        for key in ("decisions", "workstream_updates", "risks_identified", "resources_needed"):
+            pos = json_str.find(f'"{key}"')
+            if pos == -1:
+                continue
+            pos = json_str.find("[", pos)
+            if pos == -1:
+                continue
+
+            items = []
+            i = pos + 1
+            while i < len(json_str):
+                while i < len(json_str) and json_str[i] in " \t\r\n,":
+                    i += 1
+                if i >= len(json_str) or json_str[i] != "{":
+                    break
+                try:
+                    obj, i = decoder.raw_decode(json_str, i)
+                except ValueError:
+                    break
+                items.append(obj)
+            if items:
+                salvaged[key] = items
+
+        if salvaged:
+            print(f"[ProgramCrew] Salvaged partial synthesis JSON: {sorted(salvaged)}")
+        return salvaged
+
+    def _extract_decisions(self, parsed: Dict[str, Any], round_num: int) -> List[Decision]:
+        """Extract decisions from a round's parsed synthesis block."""
+        decisions = []
+
+        for d in parsed.get("decisions", []):
+            decision = Decision(
+                id=str(uuid.uuid4()),
+                round=round_num,
+                topic=d.get("topic", "Unknown"),
+                decision=d.get("decision", ""),
+                rationale=d.get("rationale", ""),
+                made_by="Program Coordinator",
+                endorsed_by=[],
+            )
+            decisions.append(decision)
+
+        return decisions
+
+    def _extract_workstreams(self, all_parsed: List[Dict[str, Any]], input_data: EPMGeneratorInput) -> List[Workstream]:
+        """Extract workstreams from the parsed synthesis blocks."""
+        workstreams = []
+
+        # Dedup by name in the same pass that walks the syntheses; first
+        # mention of a workstream wins, no intermediate merged list
+        ws_by_name = {}
+        for parsed in all_parsed:
+            for ws in parsed.get("workstream_updates", []):
+                ws_by_name.setdefault(ws.get("name", "Unknown Workstream"), ws)
+
+        for name, ws in ws_by_name.items():
+            ws_id = str(uuid.uuid4())
+            deliverable = Deliverable(
+                id=str(uuid.uuid4()),
+                name=f"{name} - Initial Deliverable",
+                description=ws.get("description", ""),
+                workstream_id=ws_id,
+                due_month=ws.get("endMonth", 3),
+                status="not_started",
+            )
+
+            workstream = Workstream(
+                id=ws_id,
+                name=name,
+                description=ws.get("description", ""),
+                owner=ws.get("owner", "TBD"),
+                deliverables=[deliverable],
+                dependencies=[],
+                resource_requirements=[],
+                start_month=ws.get("startMonth", 1),
+                end_month=ws.get("endMonth", 3),
+                confidence=0.8,
+            )
+            workstreams.append(workstream)
+
+        if not workstreams:
+            workstreams = self._generate_default_workstreams(input_data)
+
+        return workstreams
+
+    def _generate_default_workstreams(self, input_data: EPMGeneratorInput) -> List[Workstream]:
+        """Generate default workstreams if extraction fails."""
+        business_name = input_data.business_context.name
+
+        workstream1_id = str(uuid.uuid4())
+        workstream2_id = str(uuid.uuid4())
+        workstream3_id = str(uuid.uuid4())
+
+        return [
+            Workstream(
+                id=workstream1_id,
+                name="Strategy & Planning",
+                description=f"Define strategic objectives and create implementation roadmap for {business_name}",
+                owner="Strategy Lead",
+                deliverables=[
+                    Deliverable(
+                        id=str(uuid.uuid4()),
+                        name="Strategic Assessment",
+                        description="Comprehensive analysis of current state and opportunities",
+                        workstream_id=workstream1_id,
+                        due_month=1,
+                        status="not_started",
+                    ),
+                ],
+                dependencies=[],
+                resource_requirements=[
+                    ResourceRequirement(
+                        role="Strategy Consultant",
+                        skills=["Strategic Planning", "Business Analysis"],
+                        allocation=1.0,
+                        cost_per_month=15000,
+                    ),
+                ],
+                start_month=1,
+                end_month=3,
+                confidence=0.85,
+            ),
+            Workstream(
+                id=workstream2_id,
+                name="Capability Development",
+                description="Build required capabilities and skills",
+                owner="Capability Lead",
+                deliverables=[
+                    Deliverable(
+                        id=str(uuid.uuid4()),
+                        name="Capability Assessment",
+                        description="Gap analysis of current vs required capabilities",
+                        workstream_id=workstream2_id,
+                        due_month=2,
+                        status="not_started",
+                    ),
+                ],
+                dependencies=[workstream1_id],
+                resource_requirements=[
+                    ResourceRequirement(
+                        role="Capability Manager",
+                        skills=["Training", "Change Management"],
+                        allocation=0.8,
+                        cost_per_month=12000,
+                    ),
+                ],
+                start_month=2,
+                end_month=5,
+                confidence=0.8,
+            ),
+            Workstream(
+                id=workstream3_id,
+                name="Execution & Delivery",
+                description="Execute strategic initiatives and deliver outcomes",
+                owner="Delivery Lead",
+                deliverables=[
+                    Deliverable(
+                        id=str(uuid.uuid4()),
+                        name="Pilot Implementation",
+                        description="Initial rollout to validate approach",
+                        workstream_id=workstream3_id,
+                        due_month=4,
+                        status="not_started",
+                    ),
+                ],
+                dependencies=[workstream1_id, workstream2_id],
+                resource_requirements=[
+                    ResourceRequirement(
+                        role="Project Manager",
+                        skills=["Project Management", "Stakeholder Management"],
+                        allocation=1.0,
+                        cost_per_month=13000,
+                    ),
+                ],
+                start_month=3,
+                end_month=6,
+                confidence=0.75,
+            ),
+        ]
+
+    def _extract_risks(self, all_parsed: List[Dict[str, Any]]) -> List[Risk]:
+        """Extract risks from the parsed synthesis blocks."""
+        risks = []
+        seen_descriptions = set()
+
+        for parsed in all_parsed:
+            for r in parsed.get("risks_identified", []):
+                desc = r.get("description", "")
+                if desc and desc not in seen_descriptions:
+                    seen_descriptions.add(desc)
+                    risk = Risk(
+                        id=str(uuid.uuid4()),
+                        description=desc,
+                        probability=r.get("probability", "medium"),
+                        impact=r.get("impact", "medium"),
+                        mitigation=r.get("mitigation", "To be defined"),
+                        owner="Risk Committee",
+                        category="Program",
+                    )
+                    risks.append(risk)
+
+        if not risks:
+            risks = [
+                Risk(
+                    id=str(uuid.uuid4()),
+                    description="Resource availability constraints may delay timeline",
+                    probability="medium",
+                    impact="high",
+                    mitigation="Identify backup resources and establish cross-training program",
+                    owner="Resource Manager",
+                    category="Resource",
+                ),
+                Risk(
+                    id=str(uuid.uuid4()),
+                    description="Stakeholder alignment challenges",
+                    probability="medium",
+                    impact="medium",
+                    mitigation="Regular stakeholder communication and engagement sessions",
+                    owner="Program Manager",
+                    category="Stakeholder",
+                ),
+            ]
+
+        return risks
+
+    def _extract_resources(self, all_parsed: List[Dict[str, Any]]) -> List[ResourceRequirement]:
+        """Extract resources from the parsed synthesis blocks."""
+        resources = []
+        seen_roles = set()
+
+        for parsed in all_parsed:
+            for r in parsed.get("resources_needed", []):
+                role = r.get("role", "")
+                if role and role not in seen_roles:
+                    seen_roles.add(role)
+                    resource = ResourceRequirement(
+                        role=role,
+                        skills=r.get("skills", []),
+                        allocation=r.get("allocation", 1.0),
+                        cost_per_month=r.get("costPerMonth", 10000),
+                    )
+                    resources.append(resource)
+
+        if not resources:
+            resources = [
+                ResourceRequirement(role="Strategy Consultant", skills=["Strategic Planning"], allocation=1.0, cost_per_month=15000),
+                ResourceRequirement(role="Project Manager", skills=["Project Management"], allocation=1.0, cost_per_month=13000),
+                ResourceRequirement(role="Business Analyst", skills=["Analysis"], allocation=0.5, cost_per_month=10000),
+            ]
+
+        return resources
+
+    def _build_timeline(self, workstreams: List[Workstream]) -> Timeline:
+        """Build a timeline from workstreams.
+
+        Phases advance monotonically, so workstreams are swept once in
+        start_month order with a heap expiring them by end_month instead
+        of rescanning the full list per phase. Deliverable ids are
+        pre-sorted by due month per workstream so each phase takes a
+        bisected prefix rather than re-filtering.
+        """
+        import bisect
+        import heapq
+
+        if not workstreams:
+            return Timeline(phases=[], total_months=6, critical_path=[])
+
+        max_month = max(ws.end_month for ws in workstreams)
+        min_month = min(ws.start_month for ws in workstreams)
+
+        by_start = sorted(workstreams, key=lambda ws: ws.start_month)
+        due_index = {}
+        for ws in workstreams:
+            dated = sorted(
+                (d for d in ws.deliverables if d.due_month),
+                key=lambda d: d.due_month,
+            )
+            due_index[ws.id] = ([d.due_month for d in dated], [d.id for d in dated])
+
+        phases = []
+        current_phase_start = min_month
+        phase_duration = max((max_month - min_month + 1) // 3, 2)
+
+        phase_num = 1
+        next_ws = 0
+        active = []  # heap of (end_month, ws.id)
+        while current_phase_start <= max_month:
+            phase_end = min(current_phase_start + phase_duration - 1, max_month)
+
+            while next_ws < len(by_start) and by_start[next_ws].start_month <= phase_end:
+                ws = by_start[next_ws]
+                heapq.heappush(active, (ws.end_month, ws.id))
+                next_ws += 1
+            while active and active[0][0] < current_phase_start:
+                heapq.heappop(active)
+
+            phase_workstreams = [ws_id for _, ws_id in active]
+
+            phase_deliverables = []
+            for ws_id in phase_workstreams:
+                due_months, deliverable_ids = due_index[ws_id]
+                cutoff = bisect.bisect_right(due_months, phase_end)
+                phase_deliverables.extend(deliverable_ids[:cutoff])
+
+            milestone = Milestone(
+                id=str(uuid.uuid4()),
+                name=f"Phase {phase_num} Complete",
+                due_month=phase_end,
+                deliverable_ids=phase_deliverables[:5],
+            )
+
+            phase = TimelinePhase(
+                id=str(uuid.uuid4()),
+                name=f"Phase {phase_num}",
+                start_month=current_phase_start,
+                end_month=phase_end,
+                workstream_ids=phase_workstreams,
+                milestones=[milestone],
+            )
+            phases.append(phase)
+
+            current_phase_start = phase_end + 1
+            phase_num += 1
+
+        critical_path = []
+        for ws in by_start:
+            if ws.dependencies or not critical_path:
+                critical_path.append(ws.id)
+
+        return Timeline(
+            phases=phases,
+            total_months=max_month,
+            critical_path=critical_path,
+        )
+
+    def _build_resource_plan(self, resources: List[ResourceRequirement]) -> ResourcePlan:
+        """Build a resource plan from resource requirements."""
+        total_cost = 6 * sum(
+            (r.cost_per_month or 10000) * r.allocation
+            for r in resources
+        )
+
+        return ResourcePlan(
+            roles=resources,
+            total_headcount=len(resources),
+            total_cost=total_cost,
+        )
+
+    def _build_financial_plan(self, resource_plan: ResourcePlan, input_data: EPMGeneratorInput) -> FinancialPlan:
+        """Build a financial plan."""
+        personnel_cost = resource_plan.total_cost / 6
+
+        capex = [
+            FinancialItem(category="Technology", description="Software licenses and tools", amount=50000, frequency="one_time"),
+            FinancialItem(category="Infrastructure", description="Cloud infrastructure setup", amount=25000, frequency="one_time"),
+        ]
+
+        opex = [
+            FinancialItem(category="Personnel", description="Team salaries", amount=personnel_cost, frequency="monthly"),
+            FinancialItem(category="Operations", description="Ongoing operational costs", amount=10000, frequency="monthly"),
+        ]
+
+        total_budget = 75000 + (personnel_cost + 10000) * 6
+
+        if input_data.constraints and input_data.constraints.budget:
+            if total_budget > input_data.constraints.budget:
+                scale_factor = input_data.constraints.budget / total_budget
+                total_budget = input_data.constraints.budget
+                # Models are frozen; rebuild the scaled items instead of
+                # mutating amounts in place
+                capex = [
+                    item.model_copy(update={"amount": item.amount * scale_factor})
+                    for item in capex
+                ]
+                opex = [
+                    item.model_copy(update={"amount": item.amount * scale_factor})
+                    for item in opex
+                ]
+
+        return FinancialPlan(
+            capex=capex,
+            opex=opex,
+            total_budget=total_budget,
+            contingency=total_budget * 0.1,
+        )
+
+    async def generate(
+        self,
+        input_data: EPMGeneratorInput,
+        on_progress: Optional[callable] = None,
+        on_round_complete: Optional[callable] = None,
+    ) -> Dict[str, Any]:
+        """
+        Generate an EPM program using multi-agent collaboration.
+
+        Runs the planning rounds phase by phase, then synthesizes the
+        results into a complete EPM program. Awaitable on a running event
+        loop: the round work is already async (batched submission, crew
+        kickoffs, streamed synthesis), so callers with a loop should await
+        this directly rather than parking a thread on generate_sync.
+
+        Args:
+            input_data: The EPM generator input containing business context and insights
+            on_progress: Optional callback for progress updates: on_progress(round_num, round_name, agent_name=None)
+            on_round_complete: Optional coroutine awaited with
+                (round_num, round_entries) after each round, so downstream
+                consumers (e.g. the knowledge curator) can start work on
+                finished rounds while later ones are still running
+        """
+        import asyncio
+
+        print(f"[ProgramCrew] Starting generation for: {input_data.business_context.name}")
+
+        ctx = RunContext()
+        self._build_run_invariants(ctx, input_data)
+        # Agents are constructed lazily by _get_agent as rounds reference
+        # them, so startup pays nothing for ids no round uses
+
+        all_synthesis_outputs = []
+        all_parsed_syntheses = []
+        previous_outputs = {}
+
+        rounds = self.round_config.get("rounds", [])
+        phases = self._group_rounds_into_phases(rounds)
+
+        # Phases run in order; rounds within a phase have no
+        # cross-dependencies and overlap their LLM waits
+        for phase in phases:
+            results = await asyncio.gather(*(
+                self._run_round(ctx, round_config, input_data, previous_outputs, on_progress)
+                for round_config in phase
+            ))
+            for result in results:
+                if result is None:
+                    continue
+                round_num, synthesis_output, parsed_synthesis = result
+                all_synthesis_outputs.append(synthesis_output)
+                all_parsed_syntheses.append(parsed_synthesis)
+                # Later rounds see a distilled digest, not the full text
+                previous_outputs[round_num] = self._distill_round_output(
+                    synthesis_output, parsed_synthesis
+                )
+                if on_round_complete:
+                    try:
+                        await on_round_complete(
+                            round_num,
+                            [e for e in ctx.conversation_log if e.round == round_num],
+                        )
+                    except Exception as e:
+                        print(f"[ProgramCrew] Round-complete hook failed: {e}")
+
+        # Aggregation stays sequential on purpose: the extractors walk
+        # already-parsed dicts and the builders are plain Python, so the
+        # whole stage is GIL-bound microseconds - thread fan-out here
+        # would cost more than it saves
+        workstreams = self._extract_workstreams(all_parsed_syntheses, input_data)
+        risks = self._extract_risks(all_parsed_syntheses)
+        resources = self._extract_resources(all_parsed_syntheses)
+        timeline = self._build_timeline(workstreams)
+        resource_plan = self._build_resource_plan(resources)
+        financial_plan = self._build_financial_plan(resource_plan, input_data)
+
+        risk_level = "medium"
+        if len([r for r in risks if r.impact == "high"]) > len(risks) / 2:
+            risk_level = "high"
+        elif len([r for r in risks if r.impact == "low"]) > len(risks) / 2:
+            risk_level = "low"
+
+        overall_confidence = 0.8
+        if workstreams:
+            overall_confidence = sum(ws.confidence for ws in workstreams) / len(workstreams)
+
+        program = EPMProgram(
+            id=str(uuid.uuid4()),
+            title=f"{input_data.business_context.name} Strategic Transformation Program",
+            description=f"A comprehensive program to execute strategic initiatives for {input_data.business_context.name}",
+            workstreams=workstreams,
+            timeline=timeline,
+            resource_plan=resource_plan,
+            risk_register=RiskRegister(risks=risks, overall_risk_level=risk_level),
+            financial_plan=financial_plan,
+            overall_confidence=overall_confidence,
+        )
+
+        return {
+            "program": program,
+            "conversation_log": ctx.conversation_log,
+            "decisions": ctx.decisions,
+            "rounds_completed": len(all_synthesis_outputs),
+            "agents_participated": self.agents_count,
+        }
+
+    def generate_sync(self, input_data: EPMGeneratorInput, on_progress: Optional[callable] = None) -> Dict[str, Any]:
+        """Blocking wrapper around generate for callers without a loop."""
+        import asyncio
+
+        return asyncio.run(self.generate(input_data, on_progress))